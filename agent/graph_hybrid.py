@@ -1,7 +1,9 @@
 import dspy
-from typing import TypedDict, List, Dict, Any
+from typing import TypedDict, List, Dict, Any, Optional
 from langgraph.graph import StateGraph, END
+import asyncio
 import re
+import time
 
 from agent.rag.retrieval import SimpleRetriever
 from agent.tools.sqlite_tool import SqliteTool
@@ -20,6 +22,8 @@ class AgentState(TypedDict):
     citations: List[str]
     error: str
     retries: int
+    speculative_candidates: int
+    speculation: Dict[str, Any]
 
 # Initialize tools
 retriever = SimpleRetriever()
@@ -62,8 +66,7 @@ def planner_node(state: AgentState):
     print(f"  Constraints prepared")
     return {"constraints": constraints}
 
-def sql_generator_node(state: AgentState):
-    print("--- SQL GENERATOR ---")
+def build_sql_prompt(state: AgentState, extra_hint: str = "") -> str:
     schema = sqlite_tool.get_schema_for_llm()
     constraints = state.get('constraints', '')
     
@@ -71,7 +74,7 @@ def sql_generator_node(state: AgentState):
     if state.get('sql_result', {}).get('error'):
         error_feedback = f"\n\nPREVIOUS ERROR: {state['sql_result']['error']}\nPREVIOUS QUERY: {state.get('sql_query', '')}\nPlease fix the error and try again."
     
-    prompt = f"""You are a SQL expert. Generate a SQLite query based on the following:
+    return f"""You are a SQL expert. Generate a SQLite query based on the following:
 
 DATABASE SCHEMA:
 {schema}
@@ -85,15 +88,12 @@ IMPORTANT:
 - Use BETWEEN for date ranges: WHERE OrderDate BETWEEN '1997-06-01' AND '1997-06-30'
 - Use double quotes for "Order Details" table
 - Always JOIN tables properly (e.g., JOIN Orders o ON ... to access OrderDate)
-- Return ONLY the SQL query, no explanations{error_feedback}
+- Return ONLY the SQL query, no explanations{extra_hint}{error_feedback}
 
 SQL Query:"""
-    
-    # Use DSPy LM directly for more control
-    lm = dspy.settings.lm
-    response = lm(prompt, max_tokens=300)
-    
-    # Extract SQL from response
+
+def clean_sql(response) -> str:
+    """Extract a single SQL statement from the raw LM response."""
     sql = response[0] if isinstance(response, list) else str(response)
     
     # Clean up the SQL
@@ -118,11 +118,166 @@ SQL Query:"""
             clean_lines.append(line.split(';')[0] + ';')
             break
         clean_lines.append(line)
-    sql = '\n'.join(clean_lines)
+    return '\n'.join(clean_lines)
+
+def sql_generator_node(state: AgentState):
+    print("--- SQL GENERATOR ---")
+    prompt = build_sql_prompt(state)
+    
+    # Use DSPy LM directly for more control
+    lm = dspy.settings.lm
+    response = lm(prompt, max_tokens=300)
+    
+    sql = clean_sql(response)
     
     print(f"  Generated SQL: {sql[:100]}...")
     return {"sql_query": sql}
 
+# Speculative mode: (temperature, extra prompt hint) per candidate. Candidate 0 sends
+# exactly the sql_generator_node prompt, so it doubles as the serial baseline.
+SPECULATIVE_VARIANTS = [
+    (0.0, ""),
+    (0.4, "\n- Prefer the simplest query that answers the question"),
+    (0.8, "\n- Double-check every column name against the schema above"),
+    (0.6, "\n- Alias every table and qualify every column with its alias"),
+]
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 chars per token); the LM call only returns text."""
+    return max(1, len(text) // 4)
+
+def shape_mismatch(result: Dict[str, Any], format_hint: str) -> Optional[str]:
+    """Describe a column/type mismatch between a successful SQL result and format_hint, if any."""
+    rows = result.get('rows') or []
+    cols = result.get('columns') or []
+    
+    if '{' in format_hint:
+        expected_keys = re.findall(r'(\w+):\s*\w+', format_hint)
+        if len(cols) < len(expected_keys):
+            return f"Query returned columns {cols} but the expected format {format_hint} needs {len(expected_keys)}"
+    elif format_hint in ('int', 'float') and rows and rows[0][0] is not None:
+        # NULL is fine, the synthesizer maps it to 0 / 0.0
+        try:
+            float(rows[0][0])
+        except (TypeError, ValueError):
+            return f"Query returned {rows[0][0]!r}, which is not a number as required by format {format_hint}"
+    return None
+
+def result_matches_format(result: Dict[str, Any], format_hint: str) -> bool:
+    """Check that a SQL result has the shape the synthesizer expects for format_hint."""
+    if not result.get('success'):
+        return False
+    # An empty list is a legitimate answer, an empty scalar/object is not worth winning with
+    if not result.get('rows') and 'list[' not in format_hint:
+        return False
+    return shape_mismatch(result, format_hint) is None
+
+async def _run_candidate(lm, prompt: str, temperature: float, format_hint: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    if hasattr(lm, 'acall'):
+        # Async call so that cancelling the task closes the request and the LM stops generating
+        response = await lm.acall(prompt, max_tokens=300, temperature=temperature)
+    else:
+        # Older dspy without async LMs: cancelling only stops waiting, the call runs to completion
+        response = await asyncio.to_thread(lm, prompt, max_tokens=300, temperature=temperature)
+    sql = clean_sql(response)
+    raw = response[0] if isinstance(response, list) else str(response)
+    result = await asyncio.to_thread(sqlite_tool.execute_query, sql, read_only=True)
+    return {
+        "sql_query": sql,
+        "temperature": temperature,
+        "tokens": estimate_tokens(prompt) + estimate_tokens(raw),
+        "result": result,
+        "valid": result_matches_format(result, format_hint),
+        "latency": time.perf_counter() - start,
+    }
+
+async def _speculate(lm, prompts: List[str], format_hint: str):
+    tasks = {}
+    for i, prompt in enumerate(prompts):
+        temperature, _ = SPECULATIVE_VARIANTS[i]
+        tasks[asyncio.create_task(_run_candidate(lm, prompt, temperature, format_hint))] = i
+    
+    winner = None
+    finished = []
+    pending = set(tasks)
+    while pending and winner is None:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        # Sorted so that simultaneous finishers prefer the lower (more conservative) variant
+        for task in sorted(done, key=lambda t: tasks[t]):
+            try:
+                candidate = task.result()
+            except Exception as e:
+                print(f"  Candidate {tasks[task]} failed: {e}")
+                continue
+            candidate["index"] = tasks[task]
+            finished.append(candidate)
+            if candidate["valid"] and winner is None:
+                winner = candidate
+    
+    # Cancel outstanding generations and wait until their requests are torn down
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    cancelled = sorted(tasks[t] for t in pending)
+    return winner, finished, cancelled
+
+def speculative_sql_node(state: AgentState):
+    """Generate N SQL candidates concurrently and keep the first valid one."""
+    n = min(state.get('speculative_candidates', 0), len(SPECULATIVE_VARIANTS))
+    print(f"--- SPECULATIVE SQL ({n} candidates) ---")
+    format_hint = state.get('format_hint', 'str')
+    prompts = [build_sql_prompt(state, extra_hint=hint) for _, hint in SPECULATIVE_VARIANTS[:n]]
+    
+    start = time.perf_counter()
+    winner, finished, cancelled = asyncio.run(_speculate(dspy.settings.lm, prompts, format_hint))
+    wall_time = time.perf_counter() - start
+    
+    # Cancelled calls already had their prompt processed; their partial output is not visible
+    tokens_total = sum(c["tokens"] for c in finished) + sum(estimate_tokens(prompts[i]) for i in cancelled)
+    
+    # Latency win against the serial path, using candidate 0 as its first attempt. Serial mode
+    # needs at least one more generation when that attempt is invalid; assume it costs the same.
+    baseline = next((c for c in finished if c["index"] == 0), None)
+    repairs_avoided = 1 if winner and baseline and not baseline["valid"] else 0
+    if baseline:
+        latency_win = baseline["latency"] * (1 + repairs_avoided) - wall_time
+    else:
+        # Baseline was still running when a winner came in: a win, but not measurable
+        latency_win = None
+    
+    stats = {
+        "candidates": n,
+        "completed": len(finished),
+        "cancelled": len(cancelled),
+        "winner_index": winner["index"] if winner else None,
+        "wall_time": round(wall_time, 3),
+        "candidate_latencies": {c["index"]: round(c["latency"], 3) for c in finished},
+        "baseline_valid": baseline["valid"] if baseline else None,
+        "baseline_latency": round(baseline["latency"], 3) if baseline else None,
+        "repairs_avoided": repairs_avoided,
+        "latency_win": round(latency_win, 3) if latency_win is not None else None,
+        "tokens_total": tokens_total,
+        "extra_tokens": tokens_total - (winner["tokens"] if winner else 0),
+    }
+    
+    if winner is None:
+        print(f"  No valid candidate after {wall_time:.2f}s, continuing as in serial mode")
+        if not finished:
+            return {"sql_query": "", "sql_result": {"success": False, "columns": [], "rows": [], "error": "No SQL candidate was generated"}, "speculation": stats}
+        # Hand the first candidate over as serial mode would have seen it
+        fallback = min(finished, key=lambda c: c["index"])
+        result = fallback["result"]
+        error = shape_mismatch(result, format_hint) if result["success"] else None
+        if error:
+            # Ran fine but returned the wrong columns/types, report it so the repair loop kicks in
+            result = {"success": False, "columns": result["columns"], "rows": result["rows"], "error": error}
+        return {"sql_query": fallback["sql_query"], "sql_result": result, "speculation": stats}
+    
+    print(f"  Winner: candidate {winner['index']} (t={winner['temperature']}) in {wall_time:.2f}s, latency win {stats['latency_win']}s, extra tokens ~{stats['extra_tokens']}")
+    print(f"  Generated SQL: {winner['sql_query'][:100]}...")
+    return {"sql_query": winner["sql_query"], "sql_result": winner["result"], "speculation": stats}
+
 def executor_node(state: AgentState):
     """Execute SQL query."""
     print(f"--- EXECUTOR ---")
@@ -258,6 +413,7 @@ workflow.add_node("router", router_node)
 workflow.add_node("retriever", retriever_node)
 workflow.add_node("planner", planner_node)
 workflow.add_node("sql_generator", sql_generator_node)
+workflow.add_node("speculative_sql", speculative_sql_node)
 workflow.add_node("executor", executor_node)
 workflow.add_node("synthesizer", synthesizer_node)
 workflow.add_node("error_handler", error_handler_node)
@@ -266,12 +422,18 @@ workflow.add_node("error_handler", error_handler_node)
 workflow.set_entry_point("router")
 
 # Define conditional edges
+def sql_entry_decision(state: AgentState):
+    # Speculative mode only applies to the first attempt; repairs stay serial
+    if state.get('speculative_candidates', 0) > 1:
+        return "speculative_sql"
+    return "sql_generator"
+
 def route_decision(state: AgentState):
     cls = state['classification']
     if cls == 'rag':
         return "retriever"
     elif cls == 'sql':
-        return "sql_generator"
+        return sql_entry_decision(state)
     else:  # hybrid
         return "retriever"
 
@@ -280,7 +442,8 @@ workflow.add_conditional_edges(
     route_decision,
     {
         "retriever": "retriever",
-        "sql_generator": "sql_generator"
+        "sql_generator": "sql_generator",
+        "speculative_sql": "speculative_sql"
     }
 )
 
@@ -299,7 +462,14 @@ workflow.add_conditional_edges(
     }
 )
 
-workflow.add_edge("planner", "sql_generator")
+workflow.add_conditional_edges(
+    "planner",
+    sql_entry_decision,
+    {
+        "sql_generator": "sql_generator",
+        "speculative_sql": "speculative_sql"
+    }
+)
 workflow.add_edge("sql_generator", "executor")
 
 def post_executor_decision(state: AgentState):
@@ -321,8 +491,75 @@ workflow.add_conditional_edges(
     }
 )
 
+# Speculative candidates are already executed, so skip the executor
+workflow.add_conditional_edges(
+    "speculative_sql",
+    post_executor_decision,
+    {
+        "synthesizer": "synthesizer",
+        "error_handler": "error_handler"
+    }
+)
+
 workflow.add_edge("error_handler", "sql_generator")  # Retry SQL generation
 workflow.add_edge("synthesizer", END)
 
 # Compile the graph
 app = workflow.compile()
+
+
+# Test code
+if __name__ == "__main__":
+    print("Testing speculative SQL...\n")
+    
+    print("=== TEST 1: result_matches_format ===")
+    ok = lambda rows, cols=None: {"success": True, "columns": cols or ["value"], "rows": rows, "error": None}
+    assert result_matches_format(ok([(42,)]), "int")
+    assert result_matches_format(ok([(None,)]), "float")  # NULL SUM -> 0.0 in the synthesizer
+    assert not result_matches_format(ok([("abc",)]), "int")
+    assert not result_matches_format(ok([]), "int")
+    assert result_matches_format(ok([], ["product", "revenue"]), "list[{product:str, revenue:float}]")
+    assert result_matches_format(ok([("Chai", 1.0)], ["name", "rev"]), "{customer:str, margin:float}")
+    assert not result_matches_format(ok([("Chai",)], ["name"]), "{customer:str, margin:float}")
+    assert shape_mismatch(ok([]), "int") is None
+    assert shape_mismatch(ok([("abc",)]), "float") is not None
+    print("OK\n")
+    
+    class FakeLM:
+        """Answers per temperature after a delay; records cancelled calls."""
+        def __init__(self, answers, delays):
+            self.answers, self.delays, self.cancelled = answers, delays, []
+        
+        async def acall(self, prompt, max_tokens=300, temperature=0.0):
+            try:
+                await asyncio.sleep(self.delays[temperature])
+            except asyncio.CancelledError:
+                self.cancelled.append(temperature)
+                raise
+            return [self.answers[temperature]]
+    
+    state = {"question": "How many orders?", "format_hint": "int", "speculative_candidates": 4, "constraints": ""}
+    
+    print("=== TEST 2: Winner cancels the rest ===")
+    dspy.settings.configure(lm=FakeLM(
+        {0.0: "SELECT bad FROM nowhere;", 0.4: "SELECT COUNT(*) FROM Orders;", 0.8: "SELECT 1;", 0.6: "SELECT 2;"},
+        {0.0: 0.0, 0.4: 0.05, 0.8: 1.0, 0.6: 1.0}))
+    out = speculative_sql_node(state)
+    print(out["speculation"])
+    assert out["speculation"]["winner_index"] == 1 and out["speculation"]["cancelled"] == 2
+    assert sorted(dspy.settings.lm.cancelled) == [0.6, 0.8]
+    assert out["speculation"]["baseline_valid"] is False and out["speculation"]["repairs_avoided"] == 1
+    print()
+    
+    print("=== TEST 3: No winner, shape mismatch goes to the repair loop ===")
+    dspy.settings.configure(lm=FakeLM({t: "SELECT 'abc';" for t, _ in SPECULATIVE_VARIANTS}, {t: 0.0 for t, _ in SPECULATIVE_VARIANTS}))
+    out = speculative_sql_node(state)
+    print(out["sql_result"])
+    assert not out["sql_result"]["success"] and post_executor_decision({**out, "retries": 0}) == "error_handler"
+    print()
+    
+    print("=== TEST 4: No winner, empty result is passed on as serial mode would ===")
+    dspy.settings.configure(lm=FakeLM({t: "SELECT OrderID FROM Orders WHERE 0;" for t, _ in SPECULATIVE_VARIANTS}, {t: 0.0 for t, _ in SPECULATIVE_VARIANTS}))
+    out = speculative_sql_node(state)
+    print(out["sql_result"])
+    assert out["sql_result"]["success"] and post_executor_decision({**out, "retries": 0}) == "synthesizer"
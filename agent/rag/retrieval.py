@@ -1,8 +1,10 @@
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import re
+import threading
+import time
 
 class DocumentChunk:
     def __init__(self, content: str, source: str, chunk_id: str):
@@ -13,61 +15,207 @@ class DocumentChunk:
     def __repr__(self):
         return f'<Chunk "{self.chunk_id}": "{self.content[:50]}"...>'
 
+class RetrieverIndex:
+    """Immutable snapshot of the TF-IDF index, swapped in as a whole on reload."""
+    def __init__(self, chunks: List[DocumentChunk]):
+        self.chunks = chunks
+        self.vectorizer = TfidfVectorizer(stop_words="english")
+        self.tfidf_matrix = self.vectorizer.fit_transform([chunk.content for chunk in chunks]) if chunks else None
+        self.built_at = time.time()
+
+    def retrieve(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        if not self.chunks:
+            return []
+        
+        query_vec = self.vectorizer.transform([query])
+        similarities = cosine_similarity(query_vec, self.tfidf_matrix)[0]
+
+        top_indices = similarities.argsort()[-top_k:][::-1]
+
+        results = []
+        for idx in top_indices:
+            chunk = self.chunks[idx]
+            results.append({
+                "chunk_id": chunk.chunk_id,
+                "source": chunk.source,
+                "content": chunk.content,
+                "score": float(similarities[idx])
+            })
+        return results
+
 class SimpleRetriever:
     def __init__(self, docs_path: str = "docs/"):
        self.docs_path = Path(docs_path)
-       self.chunks: List[DocumentChunk] = []
-       self.vectorizer = TfidfVectorizer(stop_words="english")
-       self.tfidf_matrix = None
+       self._file_chunks: Dict[Path, List[DocumentChunk]] = {}
+       self._signatures: Dict[Path, Tuple[int, int]] = {}
+       self._index = RetrieverIndex([])
+       self._reload_lock = threading.Lock()
+       self._watch_thread: Optional[threading.Thread] = None
+       self._stop_watching = threading.Event()
+       # Replaced as a whole on every update so readers never see a half-written dict
+       self.metrics = {
+           "reloads": 0,
+           "last_reload_latency": None,
+           "last_reload_staleness": None,
+           "last_reloaded_files": [],
+           "failures": 0,
+           "last_error": None,
+           "poll_interval": None,
+       }
 
        self._load_documents()
+       self._last_poll = self._index.built_at
+       # First poll that saw a not-yet-applied change, per file
+       self._pending_since: Dict[Path, float] = {}
+
+    # Read-only views over the current snapshot
+    @property
+    def chunks(self) -> List[DocumentChunk]:
+        return self._index.chunks
+
+    @property
+    def vectorizer(self) -> TfidfVectorizer:
+        return self._index.vectorizer
+
+    @property
+    def tfidf_matrix(self):
+        return self._index.tfidf_matrix
 
     def _load_documents(self):
         if not self.docs_path.exists():
             raise FileNotFoundError(f"Docs folder not found at {self.docs_path}")
         
         for doc_file in self.docs_path.glob("*.md"):
-            self._chunk_document(doc_file)
+            self._signatures[doc_file] = self._signature(doc_file)
+            self._file_chunks[doc_file] = self._chunk_document(doc_file)
         
         # Build TF-IDF matrix
+        self._index = RetrieverIndex(self._all_chunks())
         if self.chunks:
-            texts = [chunk.content for chunk in self.chunks]
-            self.tfidf_matrix = self.vectorizer.fit_transform(texts)
-            print(f"Loaded {len(self.chunks)} chunks from {len(list(self.docs_path.glob('*.md')))} documents")
+            print(f"Loaded {len(self.chunks)} chunks from {len(self._file_chunks)} documents")
     
-    def _chunk_document(self, file_path: Path):
+    def _all_chunks(self) -> List[DocumentChunk]:
+        return [chunk for chunks in self._file_chunks.values() for chunk in chunks]
+
+    def _chunk_document(self, file_path: Path) -> List[DocumentChunk]:
         content = file_path.read_text(encoding="utf-8")
         source_name = file_path.stem
         raw_chunks = re.split(r'\n\s*\n+', content)
         
+        chunks = []
         chunk_counter = 0
         for raw_chunk in raw_chunks:
             raw_chunk = raw_chunk.strip()
             if len(raw_chunk) < 10:
                 continue
             chunk_id = f'{source_name}::chunk{chunk_counter}'
-            self.chunks.append(DocumentChunk(content=raw_chunk, source=source_name, chunk_id=chunk_id))
+            chunks.append(DocumentChunk(content=raw_chunk, source=source_name, chunk_id=chunk_id))
             chunk_counter += 1
+        return chunks
+
+    @staticmethod
+    def _signature(file_path: Path) -> Tuple[int, int]:
+        # mtime alone misses rewrites within one timestamp tick or with a preserved mtime
+        stat = file_path.stat()
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def check_for_changes(self) -> List[str]:
+        """Re-chunk added/modified/deleted docs and swap in a new index. Returns the applied file names."""
+        with self._reload_lock:
+            start = time.time()
+            # Whatever changed now happened after the previous poll
+            previous_poll, self._last_poll = self._last_poll, start
+            current = {}
+            for f in self.docs_path.glob("*.md"):
+                try:
+                    current[f] = self._signature(f)
+                except OSError:
+                    pass  # Deleted between glob() and stat(), handled as removed
+            changed = [f for f, sig in current.items() if self._signatures.get(f) != sig]
+            removed = [f for f in self._signatures if f not in current]
+            if not changed and not removed:
+                return []
+            for f in changed + removed:
+                self._pending_since.setdefault(f, previous_poll)
             
-    def retrieve(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
-        if not self.chunks:
-            return []
-        
-        query_vec = self.vectorizer.transform([query])
-        similarities = cosine_similarity(query_vec, self.tfidf_matrix)[0]
+            # Only the changed files are re-chunked; the TF-IDF fit spans all chunks
+            file_chunks = dict(self._file_chunks)
+            signatures = dict(self._signatures)
+            applied = []
+            errors = []
+            for f in changed:
+                try:
+                    file_chunks[f] = self._chunk_document(f)
+                except Exception as e:
+                    # Keep the old chunks for this file and retry it on the next poll
+                    errors.append(f"{f.name}: {e}")
+                    continue
+                signatures[f] = current[f]
+                applied.append(f)
+            for f in removed:
+                file_chunks.pop(f, None)
+                signatures.pop(f, None)
+                applied.append(f)
+            
+            metrics = dict(self.metrics)
+            if errors:
+                metrics["failures"] += len(errors)
+                metrics["last_error"] = errors[-1]
+                print(f"Docs reload failed for {', '.join(errors)}")
+            
+            names = sorted(f.name for f in applied)
+            if applied:
+                new_index = RetrieverIndex([chunk for chunks in file_chunks.values() for chunk in chunks])
+                # Single reference assignment, in-flight retrieve() calls keep their old snapshot
+                self._file_chunks = file_chunks
+                self._index = new_index
+                
+                first_seen = min(self._pending_since.pop(f) for f in applied)
+                metrics["reloads"] += 1
+                metrics["last_reload_latency"] = new_index.built_at - start
+                # Upper bound: from the poll before the change was noticed to the new index going live
+                metrics["last_reload_staleness"] = new_index.built_at - first_seen
+                metrics["last_reloaded_files"] = names
+                print(f"Reloaded docs index ({', '.join(names)}): {len(new_index.chunks)} chunks in {metrics['last_reload_latency']:.3f}s")
+            
+            self._signatures = signatures
+            self.metrics = metrics
+            return names
 
-        top_indices = similarities.argsort()[-top_k:][::-1]
+    def start_watching(self, interval: float = 2.0):
+        """Poll docs_path in a background thread and hot-reload the index on changes."""
+        if self._watch_thread and self._watch_thread.is_alive():
+            return
+        self._stop_watching.clear()
+        with self._reload_lock:
+            self.metrics = {**self.metrics, "poll_interval": interval}
 
-        results = []
-        for idx in top_indices:
-            chunk = self.chunks[idx]
-            results.append({
-                "chunk_id": chunk.chunk_id,
-                "source": chunk.source,
-                "content": chunk.content,
-                "score": float(similarities[idx])
-            })
-        return results
+        def _watch():
+            while not self._stop_watching.wait(interval):
+                try:
+                    self.check_for_changes()
+                except Exception as e:
+                    # Keep serving the previous index if a reload fails
+                    print(f"Docs reload failed: {e}")
+
+        self._watch_thread = threading.Thread(target=_watch, name="docs-watcher", daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        self._stop_watching.set()
+        if self._watch_thread:
+            self._watch_thread.join()
+            self._watch_thread = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = dict(self.metrics)
+        metrics["index_age"] = time.time() - self._index.built_at
+        metrics["watching"] = bool(self._watch_thread and self._watch_thread.is_alive())
+        return metrics
+            
+    def retrieve(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        # Grab the snapshot once; a concurrent reload swaps in a new one without touching it
+        return self._index.retrieve(query, top_k)
 
     def get_all_chunks_ids(self):
         return [chunk.chunk_id for chunk in self.chunks]
@@ -108,4 +256,41 @@ if __name__ == "__main__":
         print(f"Chunk: {result['chunk_id']}")
         print(f"Score: {result['score']:.3f}")
         print(f"Content: {result['content'][:100]}...")
-        print()
\ No newline at end of file
+        print()
+    
+    print("=== TEST 5: Hot Reload (add, modify, remove) ===")
+    import os, shutil, tempfile
+    tmp_docs = Path(tempfile.mkdtemp()) / "docs"
+    shutil.copytree("docs", tmp_docs)
+    watched = SimpleRetriever(docs_path=str(tmp_docs))
+    assert watched.check_for_changes() == []
+    old_index = watched._index
+    old_ids = [r["chunk_id"] for r in old_index.retrieve("summer 1997 marketing", top_k=2)]
+    
+    (tmp_docs / "loyalty_program.md").write_text("# Loyalty Program\n\nMembers earn double points on Beverages in 1998.", encoding="utf-8")
+    calendar = tmp_docs / "marketing_calendar.md"
+    stat = calendar.stat()
+    calendar.write_text(calendar.read_text(encoding="utf-8") + "\n\n## Spring Launch 1998\n- Dates: 1998-03-01 to 1998-03-31\n", encoding="utf-8")
+    # Same mtime as before, like cp -p or two saves in one tick; the size still changes
+    os.utime(calendar, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    (tmp_docs / "catalog.md").unlink()
+    print(watched.check_for_changes())
+    
+    ids = watched.get_all_chunks_ids()
+    assert any(i.startswith("loyalty_program::") for i in ids)
+    assert not any(i.startswith("catalog::") for i in ids)
+    assert any("Spring Launch" in c.content for c in watched.chunks)
+    # A retrieve() that grabbed the old snapshot keeps working after the swap
+    assert [r["chunk_id"] for r in old_index.retrieve("summer 1997 marketing", top_k=2)] == old_ids
+    print(watched.get_metrics())
+    print()
+    
+    print("=== TEST 6: Hot Reload (one bad file does not block the others) ===")
+    (tmp_docs / "broken.md").write_bytes(b"\xff\xfe not utf-8 at all")
+    (tmp_docs / "loyalty_program.md").write_text("# Loyalty Program\n\nMembers earn triple points on Condiments in 1998.", encoding="utf-8")
+    assert watched.check_for_changes() == ["loyalty_program.md"]
+    assert any("triple points" in c.content for c in watched.chunks)
+    metrics = watched.get_metrics()
+    print(metrics)
+    assert metrics["failures"] == 1 and "broken.md" in metrics["last_error"]
+    shutil.rmtree(tmp_docs.parent)
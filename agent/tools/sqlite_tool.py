@@ -74,16 +74,20 @@ class SqliteTool:
     
         return "\n".join(schema_parts)
 
-    def execute_query(self, sql: str) -> Dict[str, Any]:
+    def execute_query(self, sql: str, read_only: bool = False) -> Dict[str, Any]:
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            if read_only:
+                # Read-only URI connection, safe to run many candidates in parallel
+                conn = sqlite3.connect(Path(self.db_path).resolve().as_uri() + "?mode=ro", uri=True)
+            else:
+                conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             cursor.execute(sql)
            # Get column names
             columns = [desc[0] for desc in cursor.description] if cursor.description else []
             # Get all rows
             rows = cursor.fetchall()
-            conn.close()
 
             return {
                 "success": True,
@@ -99,6 +103,9 @@ class SqliteTool:
                 "rows": [],
                 "error": str(e)
             }
+        finally:
+            if conn is not None:
+                conn.close()
 
     def get_tables_names(self) -> List[str]:
         conn = sqlite3.connect(self.db_path)
@@ -143,3 +150,17 @@ if __name__ == "__main__":
     result = tool.execute_query("SELECT * FROM NonExistentTable")
     print(f"Success: {result['success']}")
     print(f"Error: {result['error']}")
+    print()
+    
+    print("=== TEST 5: Write on Read-Only Connection ===")
+    result = tool.execute_query("CREATE TABLE readonly_check (id INTEGER)", read_only=True)
+    print(f"Success: {result['success']}")
+    print(f"Error: {result['error']}")
+    assert not result['success'] and "readonly" in result['error']
+    assert "readonly_check" not in tool.get_tables_names()
+    print()
+    
+    print("=== TEST 6: Read on Read-Only Connection ===")
+    result = tool.execute_query("SELECT COUNT(*) FROM Orders", read_only=True)
+    print(f"Success: {result['success']}, Result: {result['rows']}")
+    assert result['success']
@@ -1,7 +1,7 @@
 import click
 import json
 import dspy
-from agent.graph_hybrid import app
+from agent.graph_hybrid import app, retriever, SPECULATIVE_VARIANTS
 
 # Configure DSPy with Ollama
 lm = dspy.LM(model="ollama/phi3.5:3.8b-mini-instruct-q4_K_M", api_base="http://localhost:11434")
@@ -10,8 +10,13 @@ dspy.settings.configure(lm=lm)
 @click.command()
 @click.option('--batch', help='Path to input JSONL file with questions')
 @click.option('--out', help='Path to output JSONL file')
-def main(batch, out):
+@click.option('--speculative', default=0, type=click.IntRange(0, len(SPECULATIVE_VARIANTS)), help='Generate N SQL candidates in parallel on the first attempt (0 = off)')
+@click.option('--watch-docs', is_flag=True, help='Hot-reload the docs index when files in docs/ change')
+def main(batch, out, speculative, watch_docs):
     """Run the retail analytics agent on a batch of questions."""
+    if watch_docs:
+        retriever.start_watching()
+    
     print(f"Loading questions from {batch}...")
     
     questions = []
@@ -23,6 +28,7 @@ def main(batch, out):
     print(f"Found {len(questions)} questions.")
     
     results = []
+    speculation_stats = []
     for i, item in enumerate(questions):
         q_id = item.get('id', i)
         question = item.get('question')
@@ -38,7 +44,8 @@ def main(batch, out):
             "context": [],
             "sql_result": {},
             "sql_query": "",
-            "citations": []
+            "citations": [],
+            "speculative_candidates": speculative
         }
         
         # Run the graph
@@ -63,11 +70,32 @@ def main(batch, out):
         }
         results.append(result_item)
         
+        if final_state.get('speculation'):
+            speculation_stats.append(final_state['speculation'])
+        
     # Save results
     print(f"\nSaving results to {out}...")
     with open(out, 'w') as f:
         for res in results:
             f.write(json.dumps(res) + '\n')
+    
+    if speculation_stats:
+        wall_time = sum(s['wall_time'] for s in speculation_stats)
+        measured = [s['latency_win'] for s in speculation_stats if s['latency_win'] is not None]
+        unmeasured = len(speculation_stats) - len(measured)
+        repairs_avoided = sum(s['repairs_avoided'] for s in speculation_stats)
+        extra_tokens = sum(s['extra_tokens'] for s in speculation_stats)
+        cancelled = sum(s['cancelled'] for s in speculation_stats)
+        winners = sum(1 for s in speculation_stats if s['winner_index'] is not None)
+        print(f"\nSpeculative SQL: {winners}/{len(speculation_stats)} questions had a valid candidate")
+        print(f"  Wall time: {wall_time:.2f}s")
+        print(f"  Latency win vs serial baseline: {sum(measured):.2f}s over {len(measured)} questions ({repairs_avoided} repair rounds avoided; {unmeasured} more won before the baseline finished)")
+        print(f"  Extra tokens: ~{extra_tokens} (incl. prompts of {cancelled} cancelled calls)")
+    
+    if watch_docs:
+        retriever.stop_watching()
+        metrics = retriever.get_metrics()
+        print(f"\nDocs index: {metrics['reloads']} reloads, last latency {metrics['last_reload_latency']}, last staleness {metrics['last_reload_staleness']}")
             
     print("Done!")
 